@@ -47,7 +47,9 @@ from libcrcgen.generator_test import *
 from libcrcgen.reference import *
 from libcrcgen.util import *
 import multiprocessing
+import os
 import random
+import sys
 
 
 # Derived from CRC-32 version 2.0.0 by Craig Bruce, 2006-04-29. (Public Domain):
@@ -262,18 +264,60 @@ def checkReferenceNrDataBits(nrCrcBits, polynomial):
 			raise Exception(f"CrcRefernce 32 bit word test FAILED! "
 					f"({nrCrcBits=}, P={polynomial:X})")
 
-def compareGeneratedImpl(optimize, alg, crcParameters, quick):
-	if quick == "quick":
-		dataBitsRange = (8, 16)
-	else:
-		dataBitsRange = (8, 16, 24, 32, 33, 1)
-	for nrDataBits in dataBitsRange:
-		gen = CrcGenTest(P=crcParameters["polynomial"],
-				 nrCrcBits=crcParameters["nrBits"],
-				 nrDataBits=nrDataBits,
-				 shiftRight=crcParameters["shiftRight"],
-				 optimize=optimize)
-		gen.runTests(name=alg, extra=("-O=%d" % optimize))
+def checkReferenceBlock(nrCrcBits, polynomial):
+	print(f"Testing CrcReference block ({nrCrcBits=}, P={polynomial:X})...")
+	data = bytes(dataRange())
+	# Start values that are wider than the CRC.
+	for crc in (-1, 1 << (nrCrcBits + 3), (1 << nrCrcBits) | 5):
+		for shiftRight in (True, False):
+			blockCrc = CrcReference.crcBlock(crc=crc,
+							 data=data,
+							 polynomial=polynomial,
+							 nrCrcBits=nrCrcBits,
+							 shiftRight=shiftRight)
+			byteCrc = crc
+			for b in data:
+				byteCrc = CrcReference.crc(crc=byteCrc,
+							   data=b,
+							   polynomial=polynomial,
+							   nrCrcBits=nrCrcBits,
+							   shiftRight=shiftRight)
+			if blockCrc != byteCrc:
+				raise Exception(f"CrcReference block test FAILED! "
+						f"({nrCrcBits=}, P={polynomial:X}, crc={crc})")
+	# Only the low 8 bits of the data items are used.
+	for shiftRight in (True, False):
+		a = CrcReference.crcBlock(crc=0,
+					  data=data,
+					  polynomial=polynomial,
+					  nrCrcBits=nrCrcBits,
+					  shiftRight=shiftRight)
+		b = CrcReference.crcBlock(crc=0,
+					  data=[ d | 0x100 for d in data ],
+					  polynomial=polynomial,
+					  nrCrcBits=nrCrcBits,
+					  shiftRight=shiftRight)
+		if a != b:
+			raise Exception(f"CrcReference block data item test FAILED! "
+					f"({nrCrcBits=}, P={polynomial:X})")
+
+# Keep the compiled test modules next to this script for later runs,
+# unless --no-cache is given.
+if "--no-cache" in sys.argv[1:]:
+	cacheDir = None
+else:
+	cacheDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+				"crcgen_test_cache")
+
+def compareGeneratedImpl(optimize, alg, crcParameters, nrDataBits, balanced=False):
+	gen = CrcGenTest(P=crcParameters["polynomial"],
+			 nrCrcBits=crcParameters["nrBits"],
+			 nrDataBits=nrDataBits,
+			 shiftRight=crcParameters["shiftRight"],
+			 optimize=optimize,
+			 balanced=balanced)
+	gen.runTests(name=alg, extra=("-O=%d%s" % (optimize, ", balanced" if balanced else "")),
+		     cacheDir=cacheDir)
 
 if __name__ == "__main__":
 	assert bitreverse(0xE0, 8) == 0x07
@@ -348,6 +392,17 @@ if __name__ == "__main__":
 	with multiprocessing.Pool() as p:
 		p.starmap(checkReferenceNrDataBits, params)
 
+	print("*** Comparing reference block implementation to itself ***")
+	params = (
+		(32, 0xEDB88320),
+		(16, 0xA001),
+		(16, 0x1021),
+		(8, 0x07),
+		(8, 0x8C),
+	)
+	with multiprocessing.Pool() as p:
+		p.starmap(checkReferenceBlock, params)
+
 	print("*** Comparing reference implementation to discrete implementations ***")
 	params = (
 		("CRC-32", crc32),
@@ -361,17 +416,39 @@ if __name__ == "__main__":
 	with multiprocessing.Pool() as p:
 		p.starmap(compareReferenceImpl, params)
 
+	# Each data word width is a separate job
+	# to spread the tests evenly over the pool processes.
 	def makeParams(allOptPermut, quick="not_quick"):
+		if quick == "quick":
+			dataBitsRange = (8, 16)
+		else:
+			dataBitsRange = (8, 16, 24, 32, 33, 1)
 		if allOptPermut:
 			for optimize in reversed(range(1 << CrcGen.OPT_ALL.bit_length())):
-				yield optimize, "CRC-16", CRC_PARAMETERS["CRC-16"], quick
+				for nrDataBits in dataBitsRange:
+					yield optimize, "CRC-16", CRC_PARAMETERS["CRC-16"], nrDataBits
 		else:
 			for alg, crcParameters in CRC_PARAMETERS.items():
-				yield CrcGen.OPT_ALL, alg, crcParameters, quick
+				for nrDataBits in dataBitsRange:
+					yield CrcGen.OPT_ALL, alg, crcParameters, nrDataBits
 	print("*** Comparing generated CRC functions "
 	      "to reference implementation (with all optimization option permutations)***")
 	with multiprocessing.Pool() as p:
 		p.starmap(compareGeneratedImpl, tuple(makeParams(allOptPermut=True, quick="quick")))
+	print("*** Comparing generated CRC functions "
+	      "to reference implementation (with balanced XOR trees)***")
+	with multiprocessing.Pool() as p:
+		p.starmap(compareGeneratedImpl,
+			  tuple((optimize, alg, crcParameters, nrDataBits, True)
+				for optimize, alg, crcParameters, nrDataBits
+				in makeParams(allOptPermut=True, quick="quick")))
+	print("*** Comparing generated CRC functions "
+	      "to reference implementation (with common sub expressions)***")
+	with multiprocessing.Pool() as p:
+		p.starmap(compareGeneratedImpl,
+			  tuple((optimize | CrcGen.OPT_CSE, alg, crcParameters, nrDataBits)
+				for optimize, alg, crcParameters, nrDataBits
+				in makeParams(allOptPermut=False, quick="quick")))
 	print("*** Comparing all generated CRC functions "
 	      "to reference implementation (with full optimization)***")
 	with multiprocessing.Pool() as p:
@@ -19,48 +19,126 @@
 #   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
-from dataclasses import dataclass
-from libcrcgen.util import int2poly
+from libcrcgen.util import bitreverse, int2poly
 
 __all__ = [
 	"CrcGen",
 	"CrcGenError",
 ]
 
-@dataclass(frozen=True)
+# Item type tags for fast type dispatch.
+_TAG_BIT	= 0
+_TAG_CONSTBIT	= 1
+_TAG_XOR	= 2
+
 class AbstractBit:
+	__slots__ = ()
+
 	def flatten(self):
 		return [self, ]
 
 	def optimize(self, sortLex):
 		pass
 
-@dataclass(frozen=True)
+	def balance(self):
+		pass
+
 class Bit(AbstractBit):
-	name: str
-	index: int
+	__slots__ = (
+		"name",
+		"index",
+		"_hash",
+		"_sortKey",
+		"_python",
+		"_c",
+		"_verilog",
+		"_vhdl",
+	)
+
+	_TAG = _TAG_BIT
+
+	def __init__(self, name, index):
+		# A Bit is immutable.
+		# The hash, the sort key and the generated code are constant.
+		# Compute them only once.
+		self.name = name
+		self.index = index
+		self._hash = hash((name, index))
+		self._sortKey = f"{name}_{index:07}"
+		self._python = (f"({name} & 1)" if index == 0 else
+				f"(({name} >> {index}) & 1)")
+		self._c = f"b({name}, {index})"
+		self._verilog = f"{name}[{index}]"
+		self._vhdl = f"{name}({index})"
+
+	def __eq__(self, other):
+		if self is other:
+			return True
+		if other.__class__ is not self.__class__:
+			return NotImplemented
+		return self.name == other.name and self.index == other.index
+
+	def __hash__(self):
+		return self._hash
+
+	def __repr__(self):
+		return f"Bit(name={self.name!r}, index={self.index!r})"
+
+	# Interned Bit instances. See get().
+	_cache = {}
+
+	@classmethod
+	def get(cls, name, index):
+		"""Get the shared Bit instance for 'name' and 'index'.
+		"""
+		key = (name, index)
+		bit = cls._cache.get(key)
+		if bit is None:
+			bit = cls._cache[key] = cls(name, index)
+		return bit
 
 	def gen_python(self, level=0):
-		return f"{self.name}[{self.index}]"
+		return self._python
 
 	def gen_c(self, level=0):
-		return f"b({self.name}, {self.index})"
+		return self._c
 
 	def gen_verilog(self, level=0):
-		return f"{self.name}[{self.index}]"
+		return self._verilog
 
 	def gen_vhdl(self, level=0):
-		return f"{self.name}({self.index})"
+		return self._vhdl
 
 	def gen_myhdl(self, level=0):
-		return f"{self.name}[{self.index}]"
+		# MyHDL uses the same bit index syntax as Verilog.
+		return self._verilog
 
 	def sortKey(self):
-		return f"{self.name}_{self.index:07}"
+		return self._sortKey
 
-@dataclass(frozen=True)
 class ConstBit(AbstractBit):
-	value: int
+	__slots__ = (
+		"value",
+	)
+
+	_TAG = _TAG_CONSTBIT
+
+	def __init__(self, value):
+		# A ConstBit is immutable.
+		self.value = value
+
+	def __eq__(self, other):
+		if self is other:
+			return True
+		if other.__class__ is not self.__class__:
+			return NotImplemented
+		return self.value == other.value
+
+	def __hash__(self):
+		return hash(self.value)
+
+	def __repr__(self):
+		return f"ConstBit(value={self.value!r})"
 
 	def gen_python(self, level=0):
 		return "1" if self.value else "0"
@@ -80,84 +158,228 @@ class ConstBit(AbstractBit):
 	def sortKey(self):
 		return "1" if self.value else "0"
 
+ConstBit.ZERO = ConstBit(0)
+ConstBit.ONE = ConstBit(1)
+
+class TmpBit(AbstractBit):
+	"""A temporary variable that holds a common sub expression.
+	"""
+	__slots__ = (
+		"name",
+		"_sortKey",
+	)
+
+	_TAG = _TAG_BIT
+
+	def __init__(self, prefix, index):
+		self.name = f"{prefix}{index}"
+		self._sortKey = f"{prefix}_{index:07}"
+
+	def __repr__(self):
+		return f"TmpBit(name={self.name!r})"
+
+	def gen_python(self, level=0):
+		return self.name
+
+	def gen_c(self, level=0):
+		return self.name
+
+	def gen_verilog(self, level=0):
+		return self.name
+
+	def gen_vhdl(self, level=0):
+		return self.name
+
+	def gen_myhdl(self, level=0):
+		return self.name
+
+	def sortKey(self):
+		return self._sortKey
+
 class XOR:
 	__slots__ = (
 		"__items",
+		"__sortKey",
+		"__flat",
 	)
 
+	_TAG = _TAG_XOR
+
 	def __init__(self, *items):
 		self.__items = items
+		self.__sortKey = None
+		self.__flat = False
+
+	@classmethod
+	def of(cls, items):
+		"""Construct an XOR from an already built list of items.
+		The list is used directly and not copied.
+		"""
+		self = cls.__new__(cls)
+		self.__items = items
+		self.__sortKey = None
+		self.__flat = False
+		return self
 
 	def flatten(self):
-		newItems = [ item
-			     for subItem in self.__items
-			     for item in subItem.flatten() ]
+		# optimize() only removes items, so the items stay flat.
+		if self.__flat:
+			return self.__items
+		if not any(item._TAG == _TAG_XOR for item in self.__items):
+			# There is nothing to flatten.
+			self.__flat = True
+			return self.__items
+		# Walk the tree with an explicit stack.
+		# The stack is reversed to keep the left to right item order.
+		newItems = []
+		stack = list(reversed(self.__items))
+		while stack:
+			item = stack.pop()
+			if item._TAG == _TAG_XOR:
+				if item.__flat:
+					# This subtree has already been flattened.
+					newItems.extend(item.__items)
+				else:
+					stack.extend(reversed(item.__items))
+			else:
+				newItems.append(item)
+		# The items stay unchanged until the next optimizer pass.
+		newItems = tuple(newItems)
 		self.__items = newItems
+		self.__sortKey = None
+		self.__flat = True
 		return newItems
 
 	def optimize(self, sortLex):
+		items = self.__items
+		if len(items) == 1:
+			# A single item cannot be reduced any further.
+			return
 		newItems = []
-		haveBits = {}
-		constOnes = []
-		for item in self.__items:
-			if isinstance(item, Bit):
-				# Store bit for even/uneven count analysis.
-				haveBits[item] = haveBits.get(item, 0) + 1
-			elif isinstance(item, ConstBit):
+		# The bits that occur an uneven number of times.
+		# An even count of the same bit is equal to zero.
+		# An uneven count of the same bit is equal to one of them.
+		# This is an insertion ordered dict instead of a set
+		# to get a deterministic item order.
+		unevenBits = {}
+		constOne = False
+		for item in items:
+			tag = item._TAG
+			if tag == _TAG_BIT:
+				if item in unevenBits:
+					del unevenBits[item]
+				else:
+					unevenBits[item] = None
+			elif tag == _TAG_CONSTBIT:
 				# Constant 0 does not change the XOR result. Remove it.
+				# Constant 1 toggles the result.
 				if item.value:
-					constOnes.append(item)
+					constOne = not constOne
 			else:
 				# This is something else. Keep it.
 				newItems.append(item)
-		# An even count of the same bit is equal to zero. Remove them.
-		# An uneven count of the same bit is equal to one of them. Keep one.
-		newItems.extend(bit for bit, count in haveBits.items()
-				if count % 2)
+		newItems.extend(unevenBits)
 		# If there's an uneven amount of constant ones, keep one of them.
-		if len(constOnes) % 2:
-			newItems.append(constOnes[0])
+		if constOne:
+			newItems.append(ConstBit.ONE)
 		if sortLex:
 			# XOR can be arranged in any order.
 			newItems.sort(key=lambda item: item.sortKey())
 		if not newItems:
 			# All items have been optimized out.
 			# This term shall be zero.
-			newItems.append(ConstBit(0))
-		self.__items = newItems
+			newItems.append(ConstBit.ZERO)
+		self.__items = tuple(newItems)
+		self.__sortKey = None
+
+	# Maximum number of operands in one flat XOR chain of a balanced tree.
+	BALANCE_MAX_ITEMS = 4
+
+	def balance(self):
+		"""Split a long XOR chain into a balanced tree of XORs.
+		"""
+		maxItems = self.BALANCE_MAX_ITEMS
+		def split(items):
+			if len(items) <= maxItems:
+				return XOR.of(items)
+			half = len(items) // 2
+			return XOR.of((split(items[:half]), split(items[half:])))
+		items = self.__items
+		if len(items) > maxItems:
+			half = len(items) // 2
+			self.__items = (split(items[:half]), split(items[half:]))
+			self.__flat = False
 
 	def gen_python(self, level=0):
-		return self.__gen("(", ")", level, " ^ ", lambda item: item.gen_python(level + 1))
+		return self.__gen(level, " ^ ", "gen_python")
 
 	def gen_c(self, level=0):
-		return self.__gen("(", ")", level, " ^ ", lambda item: item.gen_c(level + 1))
+		return self.__gen(level, " ^ ", "gen_c")
 
 	def gen_verilog(self, level=0):
-		return self.__gen("(", ")", level, " ^ ", lambda item: item.gen_verilog(level + 1))
+		return self.__gen(level, " ^ ", "gen_verilog")
 
 	def gen_vhdl(self, level=0):
-		return self.__gen("(", ")", level, " xor ", lambda item: item.gen_vhdl(level + 1))
+		return self.__gen(level, " xor ", "gen_vhdl")
 
 	def gen_myhdl(self, level=0):
-		return self.__gen("(", ")", level, " ^ ", lambda item: item.gen_myhdl(level + 1))
+		return self.__gen(level, " ^ ", "gen_myhdl")
 
-	def __gen(self, prefix, suffix, level, oper, itemGen):
-		assert self.__items, "Empty XOR."
+	def __gen(self, level, oper, genName):
+		# Emit the whole tree into one list of fragments
+		# and join it only once.
+		out = []
+		self.__genFragments(out, oper, genName)
 		if level == 0:
-			prefix = suffix = ""
-		return prefix + (oper.join(itemGen(item) for item in self.__items)) + suffix
+			# No parenthesis around the top level XOR.
+			return "".join(out[1:-1])
+		return "".join(out)
+
+	def __genFragments(self, out, oper, genName):
+		assert self.__items, "Empty XOR."
+		append = out.append
+		append("(")
+		first = True
+		for item in self.__items:
+			if first:
+				first = False
+			else:
+				append(oper)
+			if item._TAG == _TAG_XOR:
+				item.__genFragments(out, oper, genName)
+			else:
+				append(getattr(item, genName)())
+		append(")")
 
 	def sortKey(self):
-		return "__".join(item.sortKey() for item in self.__items)
+		# Cache the key until the items are modified.
+		if self.__sortKey is None:
+			self.__sortKey = "__".join(item.sortKey() for item in self.__items)
+		return self.__sortKey
 
 class Word:
 	__slots__ = (
 		"__items",
+		"temps",
 	)
 
 	def __init__(self, *items):
 		# items must be LSB first.
 		self.__items = list(items)
+		# The (TmpBit, XOR) definitions used by the items.
+		self.temps = ()
+
+	@classmethod
+	def of(cls, items, temps=()):
+		"""Construct a Word from an already built list of items.
+		The list is used directly and not copied.
+		'temps' is the list of (TmpBit, XOR) definitions in the
+		order of their dependencies.
+		"""
+		self = cls.__new__(cls)
+		self.__items = items
+		self.temps = temps
+		return self
 
 	def __getitem__(self, index):
 		return self.__items[index]
@@ -170,6 +392,104 @@ class Word:
 		for item in self.__items:
 			item.optimize(sortLex)
 
+	def balance(self):
+		for item in self.__items:
+			item.balance()
+
+class _FoldPclmul:
+	"""x86 PCLMUL code snippets for CrcGen.__genCFold().
+	"""
+	vecType = "__m128i"
+
+	def __init__(self, nrCrcBits, shiftRight, crcVarName, dataVarName):
+		self.nrCrcBits = nrCrcBits
+		self.shiftRight = shiftRight
+		self.crcVarName = crcVarName
+		self.dataVarName = dataVarName
+
+	def genConst(self, ret, indent, name, kLo, kHi):
+		start = f"{indent}const __m128i {name} = _mm_set_epi64x("
+		ret.append(f"{start}(long long)0x{kHi:016X}ull,")
+		ret.append(f"{' ' * len(start)}(long long)0x{kLo:016X}ull);")
+
+	def genPrepare(self, ret, indent):
+		if not self.shiftRight:
+			# Bring the bytes into big endian order.
+			ret.append(f"{indent}const __m128i bswap = _mm_set_epi8(0, 1, 2, 3, 4, 5, 6, 7,")
+			ret.append(f"{indent}                                   8, 9, 10, 11, 12, 13, 14, 15);")
+
+	def load(self, offset):
+		ptr = f"{self.dataVarName} + {offset}" if offset else self.dataVarName
+		load = f"_mm_loadu_si128((const __m128i *)({ptr}))"
+		if self.shiftRight:
+			return load
+		return f"_mm_shuffle_epi8({load}, bswap)"
+
+	def genInject(self, ret, indent, x):
+		if self.shiftRight:
+			ret.append(f"{indent}{x} = _mm_xor_si128({x}, _mm_set_epi64x("
+				   f"0, (long long){self.crcVarName}));")
+		else:
+			ret.append(f"{indent}{x} = _mm_xor_si128({x}, _mm_set_epi64x("
+				   f"(long long)((uint64_t){self.crcVarName} << {64 - self.nrCrcBits}), 0));")
+
+	def genFold(self, ret, indent, dst, x, k, y):
+		ret.append(f"{indent}{dst} = _mm_xor_si128(_mm_xor_si128(")
+		ret.append(f"{indent}    _mm_clmulepi64_si128({x}, {k}, 0x00),")
+		ret.append(f"{indent}    _mm_clmulepi64_si128({x}, {k}, 0x11)),")
+		ret.append(f"{indent}    {y});")
+
+	def genStore(self, ret, indent, x):
+		if not self.shiftRight:
+			ret.append(f"{indent}{x} = _mm_shuffle_epi8({x}, bswap);")
+		ret.append(f"{indent}_mm_storeu_si128((__m128i *)tmp, {x});")
+
+class _FoldPmull(_FoldPclmul):
+	"""ARMv8 PMULL code snippets for CrcGen.__genCFold().
+	"""
+	vecType = "uint64x2_t"
+
+	def genConst(self, ret, indent, name, kLo, kHi):
+		ret.append(f"{indent}const poly64_t {name}Lo = (poly64_t)0x{kLo:016X}ull;")
+		ret.append(f"{indent}const poly64_t {name}Hi = (poly64_t)0x{kHi:016X}ull;")
+
+	def genPrepare(self, ret, indent):
+		if not self.shiftRight:
+			# Bring the bytes into big endian order.
+			ret.append(f"{indent}static const uint8_t bswapIndex[16] = {{")
+			ret.append(f"{indent}    15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1, 0,")
+			ret.append(f"{indent}}};")
+			ret.append(f"{indent}const uint8x16_t bswap = vld1q_u8(bswapIndex);")
+
+	def load(self, offset):
+		ptr = f"{self.dataVarName} + {offset}" if offset else self.dataVarName
+		load = f"vld1q_u8({ptr})"
+		if not self.shiftRight:
+			load = f"vqtbl1q_u8({load}, bswap)"
+		return f"vreinterpretq_u64_u8({load})"
+
+	def genInject(self, ret, indent, x):
+		if self.shiftRight:
+			ret.append(f"{indent}{x} = veorq_u64({x}, vcombine_u64("
+				   f"vcreate_u64((uint64_t){self.crcVarName}), vcreate_u64(0)));")
+		else:
+			ret.append(f"{indent}{x} = veorq_u64({x}, vcombine_u64(vcreate_u64(0), "
+				   f"vcreate_u64((uint64_t){self.crcVarName} << {64 - self.nrCrcBits})));")
+
+	def genFold(self, ret, indent, dst, x, k, y):
+		ret.append(f"{indent}{dst} = veorq_u64(veorq_u64(")
+		ret.append(f"{indent}    vreinterpretq_u64_p128(vmull_p64("
+			   f"(poly64_t)vgetq_lane_u64({x}, 0), {k}Lo)),")
+		ret.append(f"{indent}    vreinterpretq_u64_p128(vmull_p64("
+			   f"(poly64_t)vgetq_lane_u64({x}, 1), {k}Hi))),")
+		ret.append(f"{indent}    {y});")
+
+	def genStore(self, ret, indent, x):
+		value = f"vreinterpretq_u8_u64({x})"
+		if not self.shiftRight:
+			value = f"vqtbl1q_u8({value}, bswap)"
+		ret.append(f"{indent}vst1q_u8(tmp, {value});")
+
 class CrcGenError(Exception):
 	pass
 
@@ -181,7 +501,12 @@ class CrcGen:
 	OPT_ELIMINATE	= 1 << 1 # Eliminate redundant operations
 	OPT_LEX		= 1 << 2 # Sort the operands in lexicographical order where possible
 
+	OPT_CSE		= 1 << 3 # Share common sub expressions between the output bits
+
 	OPT_NONE	= 0
+	# The default optimizer steps.
+	# OPT_CSE is not included, because it adds temporary variables
+	# to the generated code.
 	OPT_ALL		= OPT_FLATTEN | OPT_ELIMINATE | OPT_LEX
 
 	def __init__(self,
@@ -189,39 +514,172 @@ class CrcGen:
 		     nrCrcBits,
 		     nrDataBits=8,
 		     shiftRight=False,
-		     optimize=OPT_ALL):
+		     optimize=OPT_ALL,
+		     balanced=False):
 		self._P = P
 		self._nrCrcBits = nrCrcBits
 		self._nrDataBits = nrDataBits
 		self._shiftRight = shiftRight
 		self._optimize = optimize
+		self._balanced = balanced
+		self.__genCache = {}
 
 	def __gen(self, dataVarName, crcVarName):
+		# The generated word only depends on the variable names
+		# and the (constant) algorithm parameters.
+		# The callers do not modify the word, so it can be shared.
+		key = (dataVarName, crcVarName)
+		word = self.__genCache.get(key)
+		if word is None:
+			word = self.__genCache[key] = self.__genWord(dataVarName, crcVarName)
+		return word
+
+	def __genWord(self, dataVarName, crcVarName):
+		if self._nrCrcBits < 1 or self._nrDataBits < 1:
+			raise CrcGenError("Invalid number of bits.")
+		optFlattenEliminate = self.OPT_FLATTEN | self.OPT_ELIMINATE
+		fullyEliminated = (self._optimize & optFlattenEliminate) == optFlattenEliminate
+		if (self._optimize & self.OPT_CSE) and not fullyEliminated:
+			raise CrcGenError("The common sub expression optimizer step "
+					  "requires the flatten and eliminate steps.")
+		if fullyEliminated:
+			# The fully flattened and eliminated result can be
+			# calculated directly.
+			word = self.__genMasks(dataVarName, crcVarName)
+		else:
+			word = self.__genTree(dataVarName, crcVarName)
+		if self._balanced:
+			# Give the compiler or synthesizer a shallow expression
+			# instead of one long XOR chain.
+			word.balance()
+		return word
+
+	def __genMasks(self, dataVarName, crcVarName):
 		nrCrcBits = self._nrCrcBits
 		nrDataBits = self._nrDataBits
-		P = self._P
-		if nrCrcBits < 1 or nrDataBits < 1:
-			raise CrcGenError("Invalid number of bits.")
+		# The shift register bit positions with a polynomial coefficient.
+		taps = [ j for j in range(nrCrcBits) if (self._P >> j) & 1 ]
+
+		# Each bit of the shift register is represented by an integer mask.
+		# Every set bit in the mask is an input bit that is XORed into
+		# the shift register bit.
+		# The mask bits 0 to nrCrcBits-1 are the input CRC bits.
+		# The mask bits nrCrcBits to nrCrcBits+nrDataBits-1 are the input data bits.
+		# XOR of two shift register bits is the XOR of their masks.
+		# Therefore, the masks are always fully flattened and eliminated.
+		inBits = ([ Bit.get(crcVarName, i) for i in range(nrCrcBits) ] +
+			  [ Bit.get(dataVarName, i) for i in range(nrDataBits) ])
+
+		# Run the shift register for each input data bit.
+		word = [ 1 << i for i in range(nrCrcBits) ]
+		if self._shiftRight:
+			for i in range(nrDataBits):
+				# XOR the input bit with LSB.
+				queryBit = word[0] ^ (1 << (nrCrcBits + i))
+				# Shift to the right: j + 1
+				word = word[1:] + [ 0 ]
+				# XOR the polynomial coefficients with the query bit.
+				for j in taps:
+					word[j] ^= queryBit
+		else:
+			for i in reversed(range(nrDataBits)):
+				# XOR the input bit with MSB.
+				queryBit = word[nrCrcBits - 1] ^ (1 << (nrCrcBits + i))
+				# Shift to the left: j - 1
+				word = [ 0 ] + word[:-1]
+				# XOR the polynomial coefficients with the query bit.
+				for j in taps:
+					word[j] ^= queryBit
+
+		temps = []
+		if self._optimize & self.OPT_CSE:
+			word, tmpPairs = self.__cse(word, len(inBits))
+			for i, (a, b) in enumerate(tmpPairs):
+				tmpBit = TmpBit(f"{crcVarName}_cse", i)
+				temps.append((tmpBit, XOR.of([ inBits[a], inBits[b] ])))
+				inBits.append(tmpBit)
+
+		# Convert the masks to XOR operations on the input bits.
+		sortLex = self._optimize & self.OPT_LEX
+		items = []
+		for mask in word:
+			bits = [ bit for k, bit in enumerate(inBits) if (mask >> k) & 1 ]
+			if sortLex:
+				# XOR can be arranged in any order.
+				bits.sort(key=lambda bit: bit.sortKey())
+			if not bits:
+				# This term shall be zero.
+				bits.append(ConstBit.ZERO)
+			items.append(XOR.of(bits))
+		return Word.of(items, temps)
+
+	@staticmethod
+	def __cse(word, nrInputs):
+		"""Extract the common sub expressions of the output bit masks.
+		This is the greedy pairing algorithm by Christof Paar:
+		The pair of operands that occurs in most of the outputs
+		is replaced by a new temporary operand, until no pair
+		occurs more than once.
+		Returns the new masks and the list of (a, b) operand index pairs
+		for the temporaries. Temporary i has the operand index nrInputs+i.
+		"""
+		import heapq
+		def popcount(x):
+			return bin(x).count("1")
+		# The columns are the masks of the outputs that use an operand.
+		cols = [ sum(((mask >> k) & 1) << i for i, mask in enumerate(word))
+			 for k in range(nrInputs) ]
+		# Heap of (-count, a, b) for all operand pairs a < b.
+		# The pair counts never increase, so outdated entries
+		# can be detected and re-queued when they are popped.
+		heap = []
+		for a in range(nrInputs):
+			for b in range(a + 1, nrInputs):
+				count = popcount(cols[a] & cols[b])
+				if count >= 2:
+					heap.append((-count, a, b))
+		heapq.heapify(heap)
+		tmpPairs = []
+		while heap:
+			negCount, a, b = heapq.heappop(heap)
+			shared = cols[a] & cols[b]
+			count = popcount(shared)
+			if count != -negCount:
+				if count >= 2:
+					heapq.heappush(heap, (-count, a, b))
+				continue
+			# Replace a ^ b by the new temporary t in all shared outputs.
+			t = len(cols)
+			cols[a] &= ~shared
+			cols[b] &= ~shared
+			for k, col in enumerate(cols):
+				count = popcount(col & shared)
+				if count >= 2:
+					heapq.heappush(heap, (-count, k, t))
+			cols.append(shared)
+			tmpPairs.append((a, b))
+		# Convert the columns back to the output masks.
+		word = [ sum(((col >> i) & 1) << k for k, col in enumerate(cols))
+			 for i in range(len(word)) ]
+		return word, tmpPairs
+
+	def __genTree(self, dataVarName, crcVarName):
+		nrCrcBits = self._nrCrcBits
+		nrDataBits = self._nrDataBits
+		# The shift register bit positions with a polynomial coefficient.
+		taps = [ j for j in range(nrCrcBits) if (self._P >> j) & 1 ]
 
 		# Construct the function input data word.
-		inData = Word(*(
-			Bit(dataVarName, i)
+		inData = Word.of([
+			Bit.get(dataVarName, i)
 			for i in range(nrDataBits)
-		))
+		])
 
 		# Construct the function input CRC word.
-		inCrc  = Word(*(
-			Bit(crcVarName, i)
+		inCrc  = Word.of([
+			Bit.get(crcVarName, i)
 			for i in range(nrCrcBits)
-		))
-
-		# Helper function to XOR a polynomial bit with the data bit 'dataBit',
-		# if the decision bit 'queryBit' is set.
-		# This is done reversed, because the polynomial is constant.
-		def xor_P(dataBit, queryBit, bitNr):
-			if (P >> bitNr) & 1:
-				return XOR(dataBit, queryBit)
-			return dataBit
+		])
 
 		# Helper function to optimize the algorithm.
 		# This removes unnecessary operations.
@@ -237,29 +695,31 @@ class CrcGen:
 		if self._shiftRight:
 			for i in range(nrDataBits):
 				# Run the shift register once.
-				bits = []
-				for j in range(nrCrcBits):
-					# Shift to the right: j + 1
-					stateBit = word[j + 1] if j < nrCrcBits - 1 else ConstBit(0)
-					# XOR the input bit with LSB.
-					queryBit = XOR(word[0], inData[i])
-					# XOR the polynomial coefficient, if the query bit is set.
-					stateBit = xor_P(stateBit, queryBit, j)
-					bits.append(stateBit)
-				word = optimize(Word(*bits))
+				# XOR the input bit with LSB.
+				# The query bit is the same for all shift register bits.
+				queryBit = XOR.of([word[0], inData[i]])
+				# Shift to the right: j + 1
+				bits = [ word[j + 1] for j in range(nrCrcBits - 1) ]
+				bits.append(ConstBit.ZERO)
+				# XOR the polynomial coefficients with the query bit.
+				# This is done reversed, because the polynomial is constant.
+				for j in taps:
+					bits[j] = XOR.of([bits[j], queryBit])
+				word = optimize(Word.of(bits))
 		else:
 			for i in reversed(range(nrDataBits)):
 				# Run the shift register once.
-				bits = []
-				for j in range(nrCrcBits):
-					# Shift to the left: j - 1
-					stateBit = word[j - 1] if j > 0 else ConstBit(0)
-					# XOR the input bit with MSB.
-					queryBit = XOR(word[nrCrcBits - 1], inData[i])
-					# XOR the polynomial coefficient, if the query bit is set.
-					stateBit = xor_P(stateBit, queryBit, j)
-					bits.append(stateBit)
-				word = optimize(Word(*bits))
+				# XOR the input bit with MSB.
+				# The query bit is the same for all shift register bits.
+				queryBit = XOR.of([word[nrCrcBits - 1], inData[i]])
+				# Shift to the left: j - 1
+				bits = [ ConstBit.ZERO ]
+				bits.extend(word[j] for j in range(nrCrcBits - 1))
+				# XOR the polynomial coefficients with the query bit.
+				# This is done reversed, because the polynomial is constant.
+				for j in taps:
+					bits[j] = XOR.of([bits[j], queryBit])
+				word = optimize(Word.of(bits))
 		word = optimize(word, sort=True)
 
 		return word
@@ -293,7 +753,19 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 	def genPython(self,
 		      funcName="crc",
 		      crcVarName="crc",
-		      dataVarName="data"):
+		      dataVarName="data",
+		      numba=False,
+		      block=False):
+		if block and self._nrDataBits != 8:
+			raise CrcGenError("Python code generator: The block function "
+					  "requires an input data word width of 8 bits.")
+		def makeNumbaType(nrBits, name):
+			for bits in (8, 16, 32, 64):
+				if nrBits <= bits:
+					return f"uint{bits}"
+			raise CrcGenError("Python code generator: " + name + " sizes "
+					  "bigger than 64 bit are not supported "
+					  "with Numba.")
 		word = self.__gen(dataVarName, crcVarName)
 		ret = []
 		ret.append("# vim: ts=4 sw=4 expandtab")
@@ -302,22 +774,70 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		ret.append("")
 		ret.extend("# " + l for l in self.__algDescription().splitlines())
 		ret.append("")
+		if numba:
+			crcType = makeNumbaType(self._nrCrcBits, "CRC")
+			dataType = makeNumbaType(self._nrDataBits, "Input data")
+			types = sorted({crcType, dataType})
+			ret.append(f"from numba import njit, {', '.join(types)}")
+			ret.append("")
+			ret.append("# Call this function from another @njit function")
+			ret.append("# that loops over the data to avoid the call overhead.")
+			ret.append(f"@njit({crcType}({crcType}, {dataType}), cache=True)")
 		ret.append(f"def {funcName}({crcVarName}, {dataVarName}):")
-		ret.append(f"    class bitwrapper:")
-		ret.append(f"        def __init__(self, x):")
-		ret.append(f"            self.x = x")
-		ret.append(f"        def __getitem__(self, i):")
-		ret.append(f"            return (self.x >> i) & 1")
-		ret.append(f"        def __setitem__(self, i, x):")
-		ret.append(f"            self.x = (self.x | (1 << i)) if x else (self.x & ~(1 << i))")
-		ret.append(f"    {crcVarName} = bitwrapper({crcVarName})")
-		ret.append(f"    {dataVarName} = bitwrapper({dataVarName})")
-		ret.append(f"    ret = bitwrapper(0)")
+		for tmpBit, xor in word.temps:
+			ret.append(f"    {tmpBit.gen_python()} = {xor.gen_python()}")
 		for i, bit in enumerate(word):
-			ret.append(f"    ret[{i}] = {bit.gen_python()}")
-		ret.append("    return ret.x")
+			operator = "|=" if i > 0 else " ="
+			ret.append(f"    ret {operator} ({bit.gen_python()}) << {i}")
+		ret.append("    return ret")
+		if block:
+			self.__genPythonBlock(ret, funcName, crcVarName, dataVarName)
 		return "\n".join(ret)
 
+	def compilePython(self, block=False):
+		"""Generate the Python code and compile it.
+		Returns the byte function or, if 'block' is True, the block function.
+		"""
+		code = self.genPython(funcName="crc", block=block)
+		env = {}
+		exec(compile(code, "<crcgen>", "exec"), env)
+		return env["crc_block" if block else "crc"]
+
+	def __genPythonBlock(self, ret, funcName, crcVarName, dataVarName):
+		"""Generate the Python block function for a bytes-like 'data'.
+		"""
+		nrCrcBits = self._nrCrcBits
+		crcMask = (1 << nrCrcBits) - 1
+		ret.append("")
+		if (nrCrcBits == 32 and self._shiftRight and
+		    self._P == 0xEDB88320):
+			# This is the standard CRC-32.
+			# binascii.crc32() flips before and after the calculation.
+			ret.append("import binascii")
+			ret.append("")
+			ret.append(f"def {funcName}_block({crcVarName}, {dataVarName}):")
+			ret.append(f"    return binascii.crc32({dataVarName}, {crcVarName} ^ 0xFFFFFFFF) ^ 0xFFFFFFFF")
+			return
+		tableName = f"{funcName}_table"
+		table, = self.__genTables(1)
+		digits = (nrCrcBits + 3) // 4
+		ret.append(f"{tableName} = (")
+		for i in range(0, len(table), 8):
+			ret.append("    " + " ".join(f"0x{value:0{digits}X},"
+						for value in table[i : i + 8]))
+		ret.append(")")
+		ret.append("")
+		ret.append(f"def {funcName}_block({crcVarName}, {dataVarName}, table={tableName}):")
+		ret.append(f"    for b in {dataVarName}:")
+		if self._shiftRight:
+			ret.append(f"        {crcVarName} = table[({crcVarName} ^ b) & 0xFF] ^ ({crcVarName} >> 8)")
+		elif nrCrcBits >= 8:
+			ret.append(f"        {crcVarName} = (({crcVarName} << 8) & 0x{crcMask:X}) ^ "
+				   f"table[(({crcVarName} >> {nrCrcBits - 8}) ^ b) & 0xFF]")
+		else:
+			ret.append(f"        {crcVarName} = table[(({crcVarName} << {8 - nrCrcBits}) ^ b) & 0xFF]")
+		ret.append(f"    return {crcVarName}")
+
 	def genVerilog(self,
 		       genFunction=True,
 		       name="crc",
@@ -344,13 +864,19 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		ret.append(f"    input [{self._nrCrcBits - 1}:0] {inCrcName}{end}")
 		ret.append(f"    input [{self._nrDataBits - 1}:0] {inDataName}{end}")
 		if genFunction:
+			for tmpBit, xor in word.temps:
+				ret.append(f"    reg {tmpBit.gen_verilog()};")
 			ret.append("begin")
 		else:
 			ret.append(f"    output [{self._nrCrcBits - 1}:0] {outCrcName}")
 			ret.append(");")
+			for tmpBit, xor in word.temps:
+				ret.append(f"    wire {tmpBit.gen_verilog()};")
+		assign = "" if genFunction else "assign "
+		assignName = name if genFunction else outCrcName
+		for tmpBit, xor in word.temps:
+			ret.append(f"    {assign}{tmpBit.gen_verilog()} = {xor.gen_verilog()};")
 		for i, bit in enumerate(word):
-			assign = "" if genFunction else "assign "
-			assignName = name if genFunction else outCrcName
 			ret.append(f"    {assign}{assignName}[{i}] = {bit.gen_verilog()};")
 		if genFunction:
 			ret.append("end")
@@ -386,7 +912,11 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		ret.append(f"end entity {name};")
 		ret.append(f"")
 		ret.append(f"architecture Behavioral of {name} is")
+		for tmpBit, xor in word.temps:
+			ret.append(f"    signal {tmpBit.gen_vhdl()}: std_logic;")
 		ret.append(f"begin")
+		for tmpBit, xor in word.temps:
+			ret.append(f"    {tmpBit.gen_vhdl()} <= {xor.gen_vhdl()};")
 		for i, bit in enumerate(word):
 			ret.append(f"    {outCrcName}({i}) <= {bit.gen_vhdl()};")
 		ret.append(f"end architecture Behavioral;")
@@ -411,6 +941,8 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		ret.append(f"def {blockName}({inCrcName}, {inDataName}, {outCrcName}):")
 		ret.append("    @always_comb")
 		ret.append("    def logic():")
+		for tmpBit, xor in word.temps:
+			ret.append(f"        {tmpBit.gen_myhdl()} = {xor.gen_myhdl()}")
 		for i, bit in enumerate(word):
 			ret.append(f"        {outCrcName}.next[{i}] = {bit.gen_myhdl()}")
 		ret.append("    return logic")
@@ -425,6 +957,111 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		ret.append(f"    instance.convert(hdl='VHDL')")
 		return "\n".join(ret)
 
+	C_STYLES = (
+		"bitwise",	# Combinatorial bitwise XOR operations
+		"table",	# 256 entry lookup table (Sarwate)
+		"slice8",	# Slice-by-8 lookup tables and block function
+		"halfbyte",	# 16 entry lookup table, two 4 bit steps per byte
+	)
+
+	def __genTables(self, nrTables, nrBits=8):
+		"""Generate 'nrTables' lookup tables for 'nrBits' wide input words.
+		Table k contains the CRC of each word followed by k zero words.
+		"""
+		# Loading the Numba JIT is much more expensive
+		# than calculating these few table entries.
+		from libcrcgen.reference import CrcReference
+		P, nrCrcBits, shiftRight = self._P, self._nrCrcBits, self._shiftRight
+		tables = []
+		for k in range(nrTables):
+			tables.append([
+				CrcReference.crc((tables[-1][b] if tables else 0),
+						 (0 if tables else b),
+						 P, nrCrcBits, nrBits, shiftRight,
+						 jit=False)
+				for b in range(1 << nrBits)
+			])
+		return tables
+
+	def __xPowMod(self, k):
+		"""Calculate x^k modulo the CRC generator polynomial.
+		The result is in the non-reflected bit order.
+		"""
+		nrCrcBits = self._nrCrcBits
+		P = self._P
+		if self._shiftRight:
+			P = bitreverse(P, nrCrcBits)
+		r = 1
+		for _ in range(k):
+			r <<= 1
+			if r >> nrCrcBits:
+				r ^= (1 << nrCrcBits) | P
+		return r
+
+	def __foldConstants(self, distance):
+		"""Get the carry-less multiplication constants to fold a 128 bit value
+		over 'distance' bits for the (low, high) 64 bit halves of the value.
+		"""
+		if self._shiftRight:
+			# The reflected product of two 64 bit values is 127 bits wide.
+			# Use x^(k-1) to compensate for the missing bit.
+			return (bitreverse(self.__xPowMod(distance + 64 - 1), 64),
+				bitreverse(self.__xPowMod(distance - 1), 64))
+		return (self.__xPowMod(distance),
+			self.__xPowMod(distance + 64))
+
+	def __genCFold(self, ret, crcVarName, dataVarName, isa):
+		"""Generate the carry-less multiplication folding part
+		of the C block function.
+		Four 128 bit lanes are folded in parallel over 64 byte blocks
+		to hide the multiplication latency. The lanes are then folded
+		into one lane, which is folded over the remaining 16 byte blocks.
+		The folded value is a 16 byte message with the same CRC.
+		"""
+		T = isa.vecType
+		ret.append("    uint8_t tmp[32];")
+		ret.append("")
+		ret.append("    if (len >= 32) {")
+		isa.genConst(ret, "        ", "k", *self.__foldConstants(128))
+		isa.genPrepare(ret, "        ")
+		ret.append(f"        {T} x;")
+		ret.append("        if (len >= 128) {")
+		isa.genConst(ret, "            ", "k4", *self.__foldConstants(512))
+		for i in range(4):
+			ret.append(f"            {T} x{i} = {isa.load(i * 16)};")
+		isa.genInject(ret, "            ", "x0")
+		ret.append(f"            {dataVarName} += 64;")
+		ret.append("            len -= 64;")
+		ret.append("            do {")
+		for i in range(4):
+			isa.genFold(ret, "                ", f"x{i}", f"x{i}", "k4", isa.load(i * 16))
+		ret.append(f"                {dataVarName} += 64;")
+		ret.append("                len -= 64;")
+		ret.append("            } while (len >= 64);")
+		ret.append("            // Fold the four lanes into one.")
+		isa.genFold(ret, "            ", "x", "x0", "k", "x1")
+		isa.genFold(ret, "            ", "x", "x", "k", "x2")
+		isa.genFold(ret, "            ", "x", "x", "k", "x3")
+		ret.append("        } else {")
+		ret.append(f"            x = {isa.load(0)};")
+		isa.genInject(ret, "            ", "x")
+		ret.append(f"            {dataVarName} += 16;")
+		ret.append("            len -= 16;")
+		ret.append("        }")
+		ret.append("        while (len >= 16) {")
+		isa.genFold(ret, "            ", "x", "x", "k", isa.load(0))
+		ret.append(f"            {dataVarName} += 16;")
+		ret.append("            len -= 16;")
+		ret.append("        }")
+		ret.append("        // The folded value is a 16 byte message with the same CRC.")
+		ret.append("        // Process it together with the remaining tail bytes.")
+		isa.genStore(ret, "        ", "x")
+		ret.append(f"        memcpy(&tmp[16], {dataVarName}, len);")
+		ret.append(f"        {dataVarName} = tmp;")
+		ret.append("        len += 16;")
+		ret.append(f"        {crcVarName} = 0;")
+		ret.append("    }")
+
 	def genC(self,
 		 funcName="crc",
 		 crcVarName="crc",
@@ -433,8 +1070,18 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 		 inline=False,
 		 declOnly=False,
 		 includeGuards=True,
-		 includes=True):
-		word = self.__gen(dataVarName, crcVarName)
+		 includes=True,
+		 style="bitwise",
+		 pclmul=False,
+		 pmull=False):
+		if style not in self.C_STYLES:
+			raise CrcGenError(f"C code generator: Unknown style '{style}'.")
+		if style != "bitwise" and self._nrDataBits != 8:
+			raise CrcGenError(f"C code generator: The '{style}' style "
+					  f"requires an input data word width of 8 bits.")
+		if (pclmul or pmull) and self._nrDataBits != 8:
+			raise CrcGenError("C code generator: PCLMUL/PMULL code "
+					  "requires an input data word width of 8 bits.")
 		def makeCType(nrBits, name):
 			if nrBits <= 8:
 				cBits = 8
@@ -451,6 +1098,17 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 			return f"uint{cBits}_t"
 		cCrcType = makeCType(self._nrCrcBits, "CRC")
 		cDataType = makeCType(self._nrDataBits, "Input data")
+		nrCrcBits = self._nrCrcBits
+		crcMask = (1 << nrCrcBits) - 1
+		genBlock = style == "slice8" or pclmul or pmull
+		tableName = f"{funcName}_table"
+		suffix = "ull" if nrCrcBits > 32 else "u"
+		# PCLMUL code for the left shift needs SSSE3 for the byte swap.
+		pclmulCond = "defined(__PCLMUL__)"
+		if not self._shiftRight:
+			pclmulCond += " && defined(__SSSE3__)"
+		pmullCond = ("defined(__aarch64__) && !defined(__ARM_BIG_ENDIAN) && "
+			     "(defined(__ARM_FEATURE_CRYPTO) || defined(__ARM_FEATURE_AES))")
 		ret = []
 		ret.append("// vim: ts=4 sw=4 expandtab")
 		ret.append("")
@@ -461,16 +1119,81 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 			ret.append(f"#define {funcName.upper()}_H_")
 		if includes:
 			ret.append("")
+			if genBlock:
+				ret.append("#include <stddef.h>")
 			ret.append("#include <stdint.h>")
+			if pclmul or pmull:
+				ret.append("#include <string.h>")
+			if pclmul:
+				ret.append(f"#if {pclmulCond}")
+				ret.append("# include <wmmintrin.h>")
+				if not self._shiftRight:
+					ret.append("# include <tmmintrin.h>")
+				ret.append("#endif")
+			if pmull:
+				ret.append(f"#if {pmullCond}")
+				ret.append("# include <arm_neon.h>")
+				ret.append("#endif")
 		ret.append("")
 		ret.extend("// " + l for l in self.__algDescription().splitlines())
 		ret.append("")
 		if not declOnly:
-			ret.append("#ifdef b")
-			ret.append("# undef b")
-			ret.append("#endif")
-			ret.append("#define b(x, b) (((x) >> (b)) & 1u)")
-			ret.append("")
+			if style == "bitwise":
+				ret.append("#ifdef b")
+				ret.append("# undef b")
+				ret.append("#endif")
+				ret.append("#define b(x, b) (((x) >> (b)) & 1u)")
+				ret.append("")
+			else:
+				digits = (nrCrcBits + 3) // 4
+				perLine = 8 if digits <= 8 else 4
+				def genTable(table, indent):
+					for i in range(0, len(table), perLine):
+						tableDef.append(indent + " ".join(
+							f"0x{value:0{digits}X}{suffix},"
+							for value in table[i : i + perLine]))
+				tableDef = []
+				if style in ("table", "halfbyte"):
+					nrBits = 4 if style == "halfbyte" else 8
+					table, = self.__genTables(1, nrBits)
+					tableDef.append(f"static const {cCrcType} {tableName}[{len(table)}] = {{")
+					genTable(table, "    ")
+					tableDef.append("};")
+				else:
+					tableDef.append(f"static const {cCrcType} {tableName}[8][256] = {{")
+					for table in self.__genTables(8):
+						tableDef.append("    {")
+						genTable(table, "        ")
+						tableDef.append("    },")
+					tableDef.append("};")
+				# A non-static inline function must not reference
+				# a static object of file scope (C99 6.7.4p3).
+				# Define the table in the function bodies instead.
+				localTable = inline and not static
+				if not localTable:
+					ret.extend(tableDef)
+					ret.append("")
+			def genLocalTable():
+				if style != "bitwise" and localTable:
+					ret.extend("    " + l for l in tableDef)
+			def tableStep(crc, data, nrBits=8):
+				tbl = tableName if style != "slice8" else f"{tableName}[0]"
+				mask = f"0x{(1 << nrBits) - 1:X}u"
+				if self._shiftRight:
+					return (f"({cCrcType})(({crc} >> {nrBits}) ^ "
+						f"{tbl}[({crc} ^ {data}) & {mask}])")
+				if nrCrcBits >= nrBits:
+					return (f"({cCrcType})((({crc} << {nrBits}) ^ "
+						f"{tbl}[(({crc} >> {nrCrcBits - nrBits}) ^ {data}) & {mask}]) & "
+						f"0x{crcMask:X}{suffix})")
+				return f"{tbl}[(({crc} << {nrBits - nrCrcBits}) ^ {data}) & {mask}]"
+			def halfbyteSteps(crc, data):
+				# Process the low nibble first, if shifting right.
+				nibbles = [ data, f"({data} >> 4)" ]
+				if not self._shiftRight:
+					nibbles.reverse()
+				return [ f"{crc} = {tableStep(crc, nibble, 4)};"
+					 for nibble in nibbles ]
 		extern = "extern " if declOnly else ""
 		static = "static " if static and not declOnly else ""
 		inline = "inline " if inline and not declOnly else ""
@@ -479,13 +1202,99 @@ USE OR PERFORMANCE OF THIS SOFTWARE."""
 			   f"{funcName}({cCrcType} {crcVarName}, {cDataType} {dataVarName}){end}")
 		if not declOnly:
 			ret.append("{")
-			ret.append(f"    {cCrcType} ret;")
-			for i, bit in enumerate(word):
-				operator = "|=" if i > 0 else " ="
-				ret.append(f"    ret {operator} ({cCrcType})({bit.gen_c()}) << {i};")
-			ret.append("    return ret;")
+			genLocalTable()
+			if style == "bitwise":
+				word = self.__gen(dataVarName, crcVarName)
+				for tmpBit, xor in word.temps:
+					ret.append(f"    const {cCrcType} {tmpBit.gen_c()} = "
+						   f"({cCrcType})({xor.gen_c()});")
+				ret.append(f"    {cCrcType} ret;")
+				for i, bit in enumerate(word):
+					operator = "|=" if i > 0 else " ="
+					ret.append(f"    ret {operator} ({cCrcType})({bit.gen_c()}) << {i};")
+				ret.append("    return ret;")
+			elif style == "halfbyte":
+				for step in halfbyteSteps(crcVarName, dataVarName):
+					ret.append(f"    {step}")
+				ret.append(f"    return {crcVarName};")
+			else:
+				ret.append(f"    return {tableStep(crcVarName, dataVarName)};")
+			ret.append("}")
+			if style == "bitwise" and not genBlock:
+				ret.append("#undef b")
+		if genBlock:
+			ret.append("")
+			ret.append(f"{extern}{static}{inline}{cCrcType} "
+				   f"{funcName}_block({cCrcType} {crcVarName}, "
+				   f"const uint8_t *{dataVarName}, size_t len){end}")
+		if genBlock and not declOnly:
+			ret.append("{")
+			genLocalTable()
+			if pclmul:
+				ret.append(f"#if {pclmulCond}")
+				self.__genCFold(ret, crcVarName, dataVarName,
+						_FoldPclmul(nrCrcBits, self._shiftRight,
+							    crcVarName, dataVarName))
+			if pmull:
+				ret.append(f"#{'elif' if pclmul else 'if'} {pmullCond}")
+				self.__genCFold(ret, crcVarName, dataVarName,
+						_FoldPmull(nrCrcBits, self._shiftRight,
+							   crcVarName, dataVarName))
+			if pclmul or pmull:
+				ret.append("#endif")
+			if style == "slice8":
+				ret.append("    while (len >= 8) {")
+				# Load the 8 bytes in the CRC bit order (little endian if
+				# shifting right, big endian if shifting left) and XOR
+				# the CRC into the first bytes.
+				if self._shiftRight:
+					shifts = [ 8 * i for i in range(8) ]
+				else:
+					shifts = [ 56 - 8 * i for i in range(8) ]
+				for i, shift in enumerate(shifts):
+					load = f"((uint64_t){dataVarName}[{i}] << {shift})"
+					if i == 0:
+						ret.append(f"        uint64_t v = {load} |")
+					else:
+						ret.append(f"                     {load}{' |' if i < 7 else ';'}")
+				if self._shiftRight:
+					ret.append(f"        v ^= (uint64_t){crcVarName};")
+				else:
+					ret.append(f"        v ^= (uint64_t){crcVarName} << {64 - nrCrcBits};")
+				# Byte i is followed by 7-i more bytes of this block.
+				terms = [ f"{tableName}[{7 - i}][(v >> {shift}) & 0xFFu]"
+					  for i, shift in enumerate(shifts) ]
+				ret.append(f"        {crcVarName} = ({cCrcType})(")
+				for i, term in enumerate(terms):
+					ret.append(f"            {term}{' ^' if i < len(terms) - 1 else ''}")
+				ret.append("        );")
+				ret.append(f"        {dataVarName} += 8;")
+				ret.append("        len -= 8;")
+				ret.append("    }")
+			ret.append("    while (len--) {")
+			if style == "bitwise":
+				# The byte function cannot be called here,
+				# because the parameter names may shadow it.
+				word = self.__gen(f"*{dataVarName}", crcVarName)
+				for tmpBit, xor in word.temps:
+					ret.append(f"        const {cCrcType} {tmpBit.gen_c()} = "
+						   f"({cCrcType})({xor.gen_c()});")
+				ret.append(f"        {cCrcType} ret;")
+				for i, bit in enumerate(word):
+					operator = "|=" if i > 0 else " ="
+					ret.append(f"        ret {operator} ({cCrcType})({bit.gen_c()}) << {i};")
+				ret.append(f"        {crcVarName} = ret;")
+			elif style == "halfbyte":
+				for step in halfbyteSteps(crcVarName, f"*{dataVarName}"):
+					ret.append(f"        {step}")
+			else:
+				ret.append(f"        {crcVarName} = {tableStep(crcVarName, f'*{dataVarName}')};")
+			ret.append(f"        {dataVarName}++;")
+			ret.append("    }")
+			ret.append(f"    return {crcVarName};")
 			ret.append("}")
-			ret.append("#undef b")
+			if style == "bitwise":
+				ret.append("#undef b")
 		if includeGuards:
 			ret.append("")
 			ret.append(f"#endif /* {funcName.upper()}_H_ */")
@@ -27,11 +27,139 @@ __all__ = [
 	"CrcGenTest",
 ]
 
+def hostCpuFlags():
+	"""Get the CPU feature flags of the host.
+	"""
+	import platform
+	try:
+		with open("/proc/cpuinfo", "r") as fd:
+			flags = set(fd.read().split())
+	except OSError:
+		flags = set()
+	return platform.machine().lower(), flags
+
+def hostHasPclmul():
+	"""Check whether the host CPU supports PCLMUL and SSSE3.
+	"""
+	machine, flags = hostCpuFlags()
+	return machine in ("x86_64", "amd64") and {"pclmulqdq", "ssse3"} <= flags
+
+def hostHasPmull():
+	"""Check whether the host CPU supports ARMv8 PMULL.
+	"""
+	machine, flags = hostCpuFlags()
+	return machine in ("aarch64", "arm64") and "pmull" in flags
+
+# Portable C emulation of the NEON intrinsics used by the PMULL code.
+# This only checks the logic of the generated PMULL code on hosts
+# without PMULL. It does not test the real PMULL instructions.
+# The emulation assumes a little endian host.
+NEON_EMULATION = """
+#include <stdint.h>
+#include <string.h>
+typedef struct { uint8_t v[16]; } uint8x16_t;
+typedef struct { uint64_t v[2]; } uint64x2_t;
+typedef struct { uint64_t v[1]; } uint64x1_t;
+typedef struct { uint64_t v[2]; } poly128_t;
+typedef uint64_t poly64_t;
+
+static inline uint8x16_t vld1q_u8(const uint8_t *p)
+{
+    uint8x16_t r;
+    memcpy(r.v, p, 16);
+    return r;
+}
+
+static inline void vst1q_u8(uint8_t *p, uint8x16_t a)
+{
+    memcpy(p, a.v, 16);
+}
+
+static inline uint64x2_t vreinterpretq_u64_u8(uint8x16_t a)
+{
+    uint64x2_t r;
+    memcpy(r.v, a.v, 16);
+    return r;
+}
+
+static inline uint8x16_t vreinterpretq_u8_u64(uint64x2_t a)
+{
+    uint8x16_t r;
+    memcpy(r.v, a.v, 16);
+    return r;
+}
+
+static inline uint64x2_t vreinterpretq_u64_p128(poly128_t a)
+{
+    uint64x2_t r;
+    memcpy(r.v, a.v, 16);
+    return r;
+}
+
+static inline uint64x2_t veorq_u64(uint64x2_t a, uint64x2_t b)
+{
+    a.v[0] ^= b.v[0];
+    a.v[1] ^= b.v[1];
+    return a;
+}
+
+static inline uint64x1_t vcreate_u64(uint64_t a)
+{
+    uint64x1_t r = { { a } };
+    return r;
+}
+
+static inline uint64x2_t vcombine_u64(uint64x1_t lo, uint64x1_t hi)
+{
+    uint64x2_t r = { { lo.v[0], hi.v[0] } };
+    return r;
+}
+
+static inline uint64_t vgetq_lane_u64(uint64x2_t a, int n)
+{
+    return a.v[n];
+}
+
+static inline poly128_t vmull_p64(poly64_t a, poly64_t b)
+{
+    poly128_t r = { { 0, 0 } };
+    for (int i = 0; i < 64; i++) {
+        if ((b >> i) & 1) {
+            r.v[0] ^= a << i;
+            if (i)
+                r.v[1] ^= a >> (64 - i);
+        }
+    }
+    return r;
+}
+
+static inline uint8x16_t vqtbl1q_u8(uint8x16_t t, uint8x16_t idx)
+{
+    uint8x16_t r;
+    for (int i = 0; i < 16; i++)
+        r.v[i] = idx.v[i] < 16 ? t.v[idx.v[i]] : 0;
+    return r;
+}
+"""
+
+def loadModule(modName, path):
+	"""Load the compiled extension module 'modName' from the file 'path'.
+	"""
+	import importlib.util
+	spec = importlib.util.spec_from_file_location(modName, path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
 class CrcGenTest(CrcGen):
-	def runTests(self, name=None, extra=None):
+	def runTests(self, name=None, extra=None, cacheDir=None):
+		"""Compare the generated code to the reference implementation.
+		If 'cacheDir' is given, the compiled C test modules are kept
+		in that directory and reused by later runs.
+		"""
 		tmpdir = None
 		try:
-			import random
+			import random, sys
 			rng = random.Random()
 			rng.seed(424242)
 
@@ -43,23 +171,167 @@ class CrcGenTest(CrcGen):
 			      f"{(', ' + extra) if extra else ''} ...")
 
 			# Generate the CRC function as Python code.
-			pyCode = self.genPython(funcName="crc_pyimpl")
-			execEnv = {}
-			exec(pyCode, execEnv)
-			crc_pyimpl = execEnv["crc_pyimpl"]
+			# The block function is only available for 8 bit input data.
+			pyBlock = self._nrDataBits == 8
+			crc_pyimpl = self.compilePython()
 
 			# Generate the CRC function as C code.
-			import os, time, importlib, shutil
+			# The table styles and the block functions
+			# are only available for 8 bit input data.
+			cVariants = { "crc" : { "style" : "bitwise" } }
+			cEmuVariants = {}
+			cBlockVariants = []
+			cCompileArgs = []
+			if self._nrDataBits == 8:
+				cVariants["crc_table"] = { "style" : "table" }
+				cVariants["crc_slice8"] = { "style" : "slice8" }
+				cVariants["crc_halfbyte"] = { "style" : "halfbyte" }
+				cVariants["crc_table_inline"] = { "style" : "table",
+								  "inline" : True }
+				cVariants["crc_slice8_inline"] = { "style" : "slice8",
+								   "inline" : True }
+				cVariants["crc_halfbyte_inline"] = { "style" : "halfbyte",
+								     "inline" : True }
+				cBlockVariants.extend(("crc_slice8", "crc_slice8_inline"))
+				if hostHasPclmul():
+					cVariants["crc_pclmul"] = { "style" : "bitwise",
+								    "pclmul" : True }
+					cVariants["crc_slice8_pclmul"] = { "style" : "slice8",
+									   "pclmul" : True }
+					cVariants["crc_halfbyte_pclmul"] = { "style" : "halfbyte",
+									     "pclmul" : True }
+					cBlockVariants.extend(("crc_pclmul", "crc_slice8_pclmul",
+							       "crc_halfbyte_pclmul"))
+					cCompileArgs.extend(("-mpclmul", "-mssse3"))
+				if hostHasPmull():
+					cVariants["crc_pmull"] = { "style" : "bitwise",
+								   "pmull" : True }
+					cVariants["crc_slice8_pmull"] = { "style" : "slice8",
+									  "pmull" : True }
+					cVariants["crc_halfbyte_pmull"] = { "style" : "halfbyte",
+									    "pmull" : True }
+					cBlockVariants.extend(("crc_pmull", "crc_slice8_pmull",
+							       "crc_halfbyte_pmull"))
+					cCompileArgs.append("-march=armv8-a+crypto")
+				elif sys.byteorder == "little":
+					# Check the PMULL code with the emulated intrinsics.
+					cEmuVariants["crc_pmull_emu"] = { "style" : "bitwise",
+									  "pmull" : True }
+					cEmuVariants["crc_slice8_pmull_emu"] = { "style" : "slice8",
+										 "pmull" : True }
+					cEmuVariants["crc_halfbyte_pmull_emu"] = { "style" : "halfbyte",
+										   "pmull" : True }
+					cBlockVariants.extend(cEmuVariants.keys())
+			import os, shutil, hashlib, tempfile
+			from importlib.machinery import EXTENSION_SUFFIXES
 			from cffi import FFI
-			ffibuilder = FFI()
-			ffibuilder.set_source("testmod_crcgen", self.genC())
-			ffibuilder.cdef(self.genC(declOnly=True,
+			cSource = "\n".join(
+				self.genC(funcName=funcName, **kwargs)
+				for funcName, kwargs in cVariants.items())
+			# The extern declarations turn the inline definitions
+			# into external definitions in this translation unit.
+			cSource += "\n" + "\n".join(
+				self.genC(funcName=funcName,
+					  declOnly=True,
+					  includeGuards=False,
+					  includes=False,
+					  **kwargs)
+				for funcName, kwargs in cVariants.items()
+				if kwargs.get("inline"))
+			if cEmuVariants:
+				# Pretend to be an AArch64 target with PMULL
+				# for the emulated variants only.
+				cSource += "\n".join([
+					"",
+					"#include <stddef.h>",
+					NEON_EMULATION,
+					"#define __aarch64__ 1",
+					"#define __ARM_FEATURE_CRYPTO 1",
+				] + [
+					self.genC(funcName=funcName,
 						  includeGuards=False,
-						  includes=False))
-			tmpdir = f"tmp_{os.getpid()}_{int(time.time() * 1e6)}"
-			ffibuilder.compile(tmpdir=tmpdir, verbose=False)
-			testmod_crcgen = importlib.import_module(tmpdir + ".testmod_crcgen")
-			crc_cimpl = testmod_crcgen.lib.crc
+						  includes=False,
+						  **kwargs)
+					for funcName, kwargs in cEmuVariants.items()
+				] + [
+					"#undef __aarch64__",
+					"#undef __ARM_FEATURE_CRYPTO",
+					"",
+				])
+			cVariants.update(cEmuVariants)
+			cDef = "\n".join(
+				self.genC(funcName=funcName,
+					  declOnly=True,
+					  includeGuards=False,
+					  includes=False,
+					  **kwargs)
+				for funcName, kwargs in cVariants.items())
+			modName = "testmod_crcgen"
+			modPath = None
+			if cacheDir:
+				# The module only depends on the C code and the
+				# compiler arguments. Reuse a module that has
+				# already been built from the same input.
+				srcHash = hashlib.sha1("\0".join(
+					[ cSource, cDef ] + cCompileArgs).encode("UTF-8")).hexdigest()
+				modName = f"testmod_{srcHash[:16]}"
+				for suffix in EXTENSION_SUFFIXES:
+					path = os.path.join(cacheDir, modName + suffix)
+					if os.path.exists(path):
+						modPath = path
+						break
+			if modPath is None:
+				ffibuilder = FFI()
+				ffibuilder.set_source(modName, cSource,
+						      extra_compile_args=cCompileArgs)
+				ffibuilder.cdef(cDef)
+				tmpdir = tempfile.mkdtemp(prefix="crcgen_test_")
+				modPath = ffibuilder.compile(tmpdir=tmpdir, verbose=False)
+				if cacheDir:
+					# Move the module into the cache in one step,
+					# so that other processes never see a partial file.
+					os.makedirs(cacheDir, exist_ok=True)
+					path = os.path.join(cacheDir, os.path.basename(modPath))
+					os.replace(modPath, path)
+					modPath = path
+			testmod_crcgen = loadModule(modName, modPath)
+			crc_cimpls = { funcName: getattr(testmod_crcgen.lib, funcName)
+				       for funcName in cVariants.keys() }
+
+			def fail(ref, results, **inputs):
+				raise CrcGenError(
+					f"Test failed: "
+					f"P=0x{self._P:X}, "
+					f"nrCrcBits={self._nrCrcBits}, "
+					f"shiftRight={int(bool(self._shiftRight))}, "
+					f"nrDataBits={self._nrDataBits}, " +
+					"".join(f"{n}={v}, " for n, v in inputs.items()) +
+					f"ref=0x{ref:X}, " +
+					", ".join(f"{n}=0x{v:X}" for n, v in results.items()))
+
+			def check(crc, data, ref, py, cImpls):
+				results = { "py" : py }
+				results.update((funcName, c(crc, data))
+					       for funcName, c in cImpls.items())
+				if any(ref != result for result in results.values()):
+					fail(ref, results, crc=f"0x{crc:X}", data=f"0x{data:X}")
+
+			# The reference implementation with the constant parameters bound.
+			import functools
+			crc_ref = functools.partial(CrcReference.crc,
+						    polynomial=self._P,
+						    nrCrcBits=self._nrCrcBits,
+						    nrDataBits=self._nrDataBits,
+						    shiftRight=self._shiftRight)
+
+			# The CRC is linear over GF(2) in the crc and data inputs.
+			# Comparing the responses to all unit basis vectors
+			# therefore compares the implementations for all inputs.
+			basis = ([ (1 << i, 0) for i in range(self._nrCrcBits) ] +
+				 [ (0, 1 << i) for i in range(self._nrDataBits) ])
+			for crc, data in basis:
+				ref = crc_ref(crc=crc, data=data)
+				check(crc, data, ref, crc_pyimpl(crc, data), crc_cimpls)
 
 			# Compare the reference implementation to the Python and C code.
 			crcMask = (1 << self._nrCrcBits) - 1
@@ -79,28 +351,38 @@ class CrcGenTest(CrcGen):
 					else:
 						data = rng.randint(1, dataMask - 1)
 					for k in range(3):
-						ref = CrcReference.crc(
-							crc=crc,
-							data=data,
-							polynomial=self._P,
-							nrCrcBits=self._nrCrcBits,
-							nrDataBits=self._nrDataBits,
-							shiftRight=self._shiftRight)
-						py = crc_pyimpl(crc, data)
-						c = crc_cimpl(crc, data)
-						if ref != py or ref != c:
-							raise CrcGenError(
-								f"Test failed: "
-								f"P=0x{self._P:X}, "
-								f"nrCrcBits={self._nrCrcBits}, "
-								f"shiftRight={int(bool(self._shiftRight))}, "
-								f"nrDataBits={self._nrDataBits}, "
-								f"data=0x{data:X}, "
-								f"ref=0x{ref:X}, "
-								f"py=0x{py:X}, "
-								f"c=0x{c:X}")
+						ref = crc_ref(crc=crc, data=data)
+						check(crc, data, ref, crc_pyimpl(crc, data), crc_cimpls)
 						crc = ref
 						data = (data + 1) & dataMask
+
+			# Compare the reference implementation to the block functions.
+			def cBlockImpl(funcName):
+				c = getattr(testmod_crcgen.lib, f"{funcName}_block")
+				ffi = testmod_crcgen.ffi
+				return lambda crc, buf: c(crc, ffi.from_buffer(buf), len(buf))
+			blockImpls = { f"{funcName}_block" : cBlockImpl(funcName)
+				       for funcName in cBlockVariants }
+			if pyBlock:
+				blockImpls["crc_pyimpl_block"] = self.compilePython(block=True)
+			for funcName, crc_block in blockImpls.items():
+				# Cover the tail handling of all block loops.
+				lengths = (list(range(64)) + list(range(120, 136)) +
+					   [ 1000 ] + ([ 1024 ] * 8))
+				for length in lengths:
+					crc = rng.randint(0, crcMask)
+					buf = bytes(rng.randint(0, 0xFF) for _ in range(length))
+					ref = CrcReference.crcBlock(
+						crc=crc,
+						data=buf,
+						polynomial=self._P,
+						nrCrcBits=self._nrCrcBits,
+						nrDataBits=8,
+						shiftRight=self._shiftRight)
+					c = crc_block(crc, buf)
+					if ref != c:
+						fail(ref, { funcName : c },
+						     crc=f"0x{crc:X}", length=length)
 		finally:
 			if tmpdir:
 				shutil.rmtree(tmpdir, ignore_errors=True)
@@ -112,14 +112,45 @@ def main():
 			       help="Generate static C function. (only if -c)")
 		p.add_argument("-I", "--inline", action="store_true",
 			       help="Generate inline C function. (only if -c)")
+		p.add_argument("-t", "--c-style", type=str,
+			       choices=CrcGen.C_STYLES, default="bitwise",
+			       help="C code style: bitwise XOR operations, "
+				    "one 256 entry lookup table, "
+				    "slice-by-8 lookup tables with an additional block function or "
+				    "one 16 entry lookup table with two 4 bit steps per byte. "
+				    "The table styles require 8 input data bits. (only if -c)")
+		p.add_argument("--c-pclmul", action="store_true",
+			       help="Generate an additional C block function that uses "
+				    "x86 PCLMUL carry-less multiplication to fold 16 bytes at a time, "
+				    "if the compiler enables PCLMUL. "
+				    "Requires 8 input data bits. (only if -c)")
+		p.add_argument("--c-pmull", action="store_true",
+			       help="Generate an additional C block function that uses "
+				    "ARMv8 PMULL carry-less multiplication to fold 16 bytes at a time, "
+				    "if the compiler enables the ARMv8 crypto extension. "
+				    "Requires 8 input data bits. (only if -c)")
+		p.add_argument("--python-numba", action="store_true",
+			       help="Decorate the generated Python function with "
+				    "the Numba @njit JIT compiler. (only if -p)")
+		p.add_argument("--python-block", action="store_true",
+			       help="Generate an additional Python block function "
+				    "for bytes-like data. "
+				    "Requires 8 input data bits. (only if -p)")
 		p.add_argument("-O", "--optimize", type=argInt, default=CrcGen.OPT_ALL,
 			       help=f"Select individual algorithm optimizer steps. "
 				    f"The argument to the -O option can be any sum of the following integers: "
 				    f"-O{CrcGen.OPT_FLATTEN} (Flatten the bit operation tree), "
 				    f"-O{CrcGen.OPT_ELIMINATE} (Eliminate redundant operations), "
-				    f"-O{CrcGen.OPT_LEX} (Sort the operands in lexicographical order where possible). "
+				    f"-O{CrcGen.OPT_LEX} (Sort the operands in lexicographical order where possible), "
+				    f"-O{CrcGen.OPT_CSE} (Share common sub expressions between the output bits "
+				    f"in temporary variables; only together with -O{CrcGen.OPT_FLATTEN | CrcGen.OPT_ELIMINATE}). "
 				    f"-O{CrcGen.OPT_NONE} disables all optimizer steps. "
-				    f"If this option is not given, then by default all optimizer steps are enabled (-O{CrcGen.OPT_ALL}).")
+				    f"If this option is not given, then by default the optimizer steps "
+				    f"-O{CrcGen.OPT_ALL} are enabled.")
+		p.add_argument("--balanced", action="store_true",
+			       help="Split long XOR chains into a balanced tree of "
+				    "parenthesized XOR sub expressions. "
+				    "This gives the compiler or synthesizer a shallow expression tree.")
 		args = p.parse_args()
 
 		if (args.nr_crc_bits is not None and
@@ -165,44 +196,46 @@ def main():
 				  nrCrcBits=nrCrcBits,
 				  nrDataBits=args.nr_data_bits,
 				  shiftRight=shiftRight,
-				  optimize=args.optimize)
+				  optimize=args.optimize,
+				  balanced=args.balanced)
 		if args.test:
 			gen.runTests()
-		else:
-			if args.python:
-				print(gen.genPython(funcName=args.name,
-						    crcVarName=args.crc_in_param,
-						    dataVarName=args.data_param))
-			elif args.verilog_function:
-				print(gen.genVerilog(genFunction=True,
-						     name=args.name,
-						     inDataName=args.data_param,
-						     inCrcName=args.crc_in_param,
-						     outCrcName=args.crc_out_param))
-			elif args.verilog_module:
-				print(gen.genVerilog(genFunction=False,
-						     name=args.name,
-						     inDataName=args.data_param,
-						     inCrcName=args.crc_in_param,
-						     outCrcName=args.crc_out_param))
-			elif args.vhdl:
-				print(gen.genVHDL(name=args.name,
-						  inDataName=args.data_param,
-						  inCrcName=args.crc_in_param,
-						  outCrcName=args.crc_out_param))
-			elif args.myhdl:
-				print(gen.genMyHDL(blockName=args.name,
-						   inDataName=args.data_param,
-						   inCrcName=args.crc_in_param,
-						   outCrcName=args.crc_out_param))
-			elif args.c:
-				print(gen.genC(funcName=args.name,
+			return 0
+
+		hdlNames = {
+			"inDataName"	: args.data_param,
+			"inCrcName"	: args.crc_in_param,
+			"outCrcName"	: args.crc_out_param,
+		}
+		generators = {
+			"python" : lambda: gen.genPython(funcName=args.name,
+							 crcVarName=args.crc_in_param,
+							 dataVarName=args.data_param,
+							 numba=args.python_numba,
+							 block=args.python_block),
+			"verilog_function" : lambda: gen.genVerilog(genFunction=True,
+								    name=args.name,
+								    **hdlNames),
+			"verilog_module" : lambda: gen.genVerilog(genFunction=False,
+								  name=args.name,
+								  **hdlNames),
+			"vhdl" : lambda: gen.genVHDL(name=args.name,
+						     **hdlNames),
+			"myhdl" : lambda: gen.genMyHDL(blockName=args.name,
+						       **hdlNames),
+			"c" : lambda: gen.genC(funcName=args.name,
 					       crcVarName=args.crc_in_param,
 					       dataVarName=args.data_param,
 					       static=args.static,
-					       inline=args.inline))
-			else:
-				assert False
+					       inline=args.inline,
+					       style=args.c_style,
+					       pclmul=args.c_pclmul,
+					       pmull=args.c_pmull),
+		}
+		# Exactly one of the generator options is set.
+		genFunc = next(genFunc for option, genFunc in generators.items()
+			       if getattr(args, option))
+		print(genFunc())
 		return 0
 	except CrcGenError as e:
 		print("ERROR: " + str(e), file=sys.stderr)
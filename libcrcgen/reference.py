@@ -23,8 +23,65 @@ __all__ = [
 	"CrcReference",
 ]
 
+from functools import lru_cache
 from typing import Iterable
 
+def _crc(crc, data, polynomial, nrCrcBits, nrDataBits, shiftRight):
+	crcMask = (1 << nrCrcBits) - 1
+	msbShift = nrCrcBits - 1
+	# -(bit) is all ones, if the shifted out bit is set.
+	# Otherwise it is zero. This selects the polynomial without a branch.
+	if shiftRight:
+		for i in range(nrDataBits):
+			crc ^= data & 1
+			data >>= 1
+			crc = ((crc >> 1) ^ (polynomial & -(crc & 1))) & crcMask
+	else:
+		for i in range(nrDataBits):
+			crc ^= ((data >> (nrDataBits - 1)) & 1) << msbShift
+			data <<= 1
+			crc = ((crc << 1) ^ (polynomial & -((crc >> msbShift) & 1))) & crcMask
+	return crc
+
+# Use a JIT compiled version of _crc(), if Numba is available.
+# It calculates with 64 bit integers, so it is only used for values
+# that have enough headroom for the left shifts.
+# Importing Numba is expensive, so this is only done on the first use.
+_JIT_MAX_BITS = 62
+_crcJit = None
+_crcJitLoaded = False
+
+def _getCrcJit():
+	"""Get the JIT compiled _crc() or None, if Numba is not available.
+	"""
+	global _crcJit, _crcJitLoaded
+	if not _crcJitLoaded:
+		_crcJitLoaded = True
+		try:
+			from numba import njit
+			_crcJit = njit(cache=True)(_crc)
+		except ImportError:
+			pass
+	return _crcJit
+
+@lru_cache(maxsize=None)
+def _byteTable(polynomial, nrCrcBits, shiftRight):
+	"""Get the 256 entry byte lookup table for crc() and crcBlock().
+	"""
+	return tuple(_crc(0, b, polynomial, nrCrcBits, 8, shiftRight)
+		     for b in range(256))
+
+def _crcByte(table, crc, b, nrCrcBits, shiftRight):
+	"""Run one table step of 8 data bits.
+	"""
+	if shiftRight:
+		return table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+	if nrCrcBits >= 8:
+		shift = nrCrcBits - 8
+		return (((crc << 8) & ((1 << nrCrcBits) - 1)) ^
+			table[((crc >> shift) ^ b) & 0xFF])
+	return table[((crc << (8 - nrCrcBits)) ^ b) & 0xFF]
+
 class CrcReference:
 	"""Generic CRC reference implementation.
 	"""
@@ -36,28 +93,26 @@ class CrcReference:
 		polynomial: int,
 		nrCrcBits: int,
 		nrDataBits: int = 8,
-		shiftRight: bool = False):
+		shiftRight: bool = False,
+		jit: bool = True):
+		"""Calculate the CRC of one data word.
+		If 'jit' is False, the Numba JIT is not loaded.
+		"""
 
-		crcMask = (1 << nrCrcBits) - 1
-		msb = 1 << (nrCrcBits - 1)
-		lsb = 1
-		if shiftRight:
-			for i in range(nrDataBits):
-				crc ^= data & 1
-				data >>= 1
-				if crc & lsb:
-					crc = ((crc >> 1) ^ polynomial) & crcMask
-				else:
-					crc = (crc >> 1) & crcMask
-		else:
-			for i in range(nrDataBits):
-				crc ^= ((data >> (nrDataBits - 1)) & 1) << (nrCrcBits - 1)
-				data <<= 1
-				if crc & msb:
-					crc = ((crc << 1) ^ polynomial) & crcMask
-				else:
-					crc = (crc << 1) & crcMask
-		return crc
+		if nrDataBits == 8 and crc >> nrCrcBits == 0:
+			# Use the cached byte table.
+			table = _byteTable(polynomial, nrCrcBits, bool(shiftRight))
+			return _crcByte(table, crc, data, nrCrcBits, shiftRight)
+		if (jit and
+		    nrCrcBits <= _JIT_MAX_BITS and
+		    nrDataBits <= _JIT_MAX_BITS and
+		    (crc | data | polynomial) >> _JIT_MAX_BITS == 0):
+			crcJit = _getCrcJit()
+			if crcJit is not None:
+				return crcJit(crc, data, polynomial,
+					      nrCrcBits, nrDataBits, bool(shiftRight))
+		return _crc(crc, data, polynomial,
+			    nrCrcBits, nrDataBits, shiftRight)
 
 	@classmethod
 	def crcBlock(cls,
@@ -73,13 +128,37 @@ class CrcReference:
 		crcMask = (1 << nrCrcBits) - 1
 		if preFlip:
 			crc ^= crcMask
-		for b in data:
-			crc = cls.crc(crc=crc,
-				      data=b,
-				      polynomial=polynomial,
-				      nrCrcBits=nrCrcBits,
-				      nrDataBits=nrDataBits,
-				      shiftRight=shiftRight)
+		if nrDataBits != 8 or crc >> nrCrcBits != 0:
+			# The byte table only handles start values
+			# within nrCrcBits.
+			for b in data:
+				crc = cls.crc(crc=crc,
+					      data=b,
+					      polynomial=polynomial,
+					      nrCrcBits=nrCrcBits,
+					      nrDataBits=nrDataBits,
+					      shiftRight=shiftRight)
+		elif (nrCrcBits == 32 and shiftRight and
+		      polynomial == 0xEDB88320 and
+		      isinstance(data, (bytes, bytearray))):
+			# This is the standard CRC-32 over bytes.
+			# binascii.crc32() flips before and after the calculation.
+			# Undo these flips.
+			import binascii
+			crc = binascii.crc32(data, crc ^ crcMask) ^ crcMask
+		else:
+			table = _byteTable(polynomial, nrCrcBits, bool(shiftRight))
+			if shiftRight:
+				for b in data:
+					crc = table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+			elif nrCrcBits >= 8:
+				shift = nrCrcBits - 8
+				for b in data:
+					crc = ((crc << 8) & crcMask) ^ table[((crc >> shift) ^ b) & 0xFF]
+			else:
+				shift = 8 - nrCrcBits
+				for b in data:
+					crc = table[((crc << shift) ^ b) & 0xFF]
 		if postFlip:
 			crc ^= crcMask
 		return crc
@@ -19,7 +19,7 @@
 #   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
-import re
+from functools import lru_cache
 
 __all__ = [
 	"bitreverse",
@@ -27,15 +27,33 @@ __all__ = [
 	"int2poly",
 ]
 
+# Polynomial term strings for the exponents 0 to 64.
+_EXP_STR = [ "1", "x" ] + [ f"x^{i}" for i in range(2, 65) ]
+
+def _expStr(exp):
+	return _EXP_STR[exp] if exp < len(_EXP_STR) else f"x^{exp}"
+
+# Bit reversed values of all bytes.
+_REV8 = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
 def bitreverse(value, nrBits):
 	"""Reverse the bits in an integer.
 	"""
-	ret = 0
-	for _ in range(nrBits):
-		ret = (ret << 1) | (value & 1)
-		value >>= 1
-	return ret
+	mask = (1 << nrBits) - 1
+	value &= mask
+	if value == 0 or value == mask:
+		# All bits are equal. The value is its own reverse.
+		return value
+	# Reverse the byte order and the bits in each byte
+	# and then shift out the padding bits of the last byte.
+	nrBytes = (nrBits + 7) >> 3
+	value = int.from_bytes(value.to_bytes(nrBytes, "little").translate(_REV8), "big")
+	return value >> ((nrBytes << 3) - nrBits)
+
+# The polynomial conversions are pure functions that are called
+# repeatedly with the same few polynomials.
 
+@lru_cache(maxsize=256)
 def poly2int(polyString, nrBits, shiftRight=False):
 	"""Convert polynomial coefficient string to binary integer.
 	"""
@@ -52,7 +70,8 @@ def poly2int(polyString, nrBits, shiftRight=False):
 			poly = int(polyString, 10)
 		except ValueError:
 			# Polynomial coefficient format
-			polyString, _ = re.subn(r"\s+", "", polyString)
+			# Remove all whitespace.
+			polyString = "".join(polyString.split())
 			poly = 0
 			try:
 				for bit in polyString.split("+"):
@@ -71,23 +90,17 @@ def poly2int(polyString, nrBits, shiftRight=False):
 		poly = bitreverse(poly, nrBits)
 	return poly
 
+@lru_cache(maxsize=256)
 def int2poly(poly, nrBits, shiftRight=False):
 	"""Convert binary integer polynomial coefficient to string.
 	"""
 	poly &= (1 << nrBits) - 1
 	if shiftRight:
 		poly = bitreverse(poly, nrBits)
-	p = []
-	shift = 0
+	p = [ f"x^{nrBits}" ]
 	while poly:
-		if poly & 1:
-			if shift == 0:
-				p.append("1")
-			elif shift == 1:
-				p.append("x")
-			else:
-				p.append(f"x^{shift}")
-		shift += 1
-		poly >>= 1
-	p.append(f"x^{nrBits}")
-	return " + ".join(reversed(p))
+		# Get the highest set bit.
+		shift = poly.bit_length() - 1
+		p.append(_expStr(shift))
+		poly ^= 1 << shift
+	return " + ".join(p)
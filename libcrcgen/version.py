@@ -29,4 +29,4 @@ __all__ = [
 VERSION_MAJOR = 2
 VERSION_MINOR = 6
 VERSION_EXTRA = ""
-VERSION_STRING = "%d.%d%s" % (VERSION_MAJOR, VERSION_MINOR, VERSION_EXTRA)
+VERSION_STRING = f"{VERSION_MAJOR}.{VERSION_MINOR}{VERSION_EXTRA}"